@@ -52,6 +52,8 @@ static int static_label_count = 0;
 static int debug_last_line = 0;  /* last line emitted for debug tracking */
 static int sret_offset = 0;      /* stack offset where hidden return pointer is saved (struct returns) */
 
+static void reset_unit_state(void);
+
 /* Check if a type requires struct-return ABI (hidden pointer) */
 static int is_struct_return(Type *t) {
     return t && (t->kind == TYPE_STRUCT || t->kind == TYPE_UNION);
@@ -486,6 +488,7 @@ void arch_x86_set_target(TargetPlatform target) {
 void arch_x86_generate(ASTNode *program) {
     current_program = program;
     pgo_probe_count = 0; /* reset PGO probes for this compilation unit */
+    reset_unit_state();
     if (g_target == TARGET_DOS && out) {
         fprintf(out, ".code16\n");
     }
@@ -3260,6 +3263,20 @@ static int loop_saved_stack_offset[32];
 static int loop_saved_locals_count[32];
 static int loop_saved_stack_ptr = 0;
 
+/* Clear per-file tables and counters so each compilation unit in a
+ * multi-file run produces the same output as when compiled on its own. */
+static void reset_unit_state(void) {
+    int i;
+    for (i = 0; i < string_literals_count; i++) {
+        free(string_literals[i].label);
+        free(string_literals[i].value);
+    }
+    string_literals_count = 0;
+    globals_count = 0;
+    label_count = 0;
+    static_label_count = 0;
+}
+
 static void collect_cases(ASTNode *node, ASTNode **cases, int *case_count, ASTNode **default_node) {
     if (!node) return;
     if (node->type == AST_CASE) {
@@ -48,6 +48,8 @@ static int static_label_count = 0;
 static int debug_last_line = 0;  /* last line emitted for debug tracking */
 static int sret_offset = 0;      /* stack offset where hidden return pointer is saved (struct returns) */
 
+static void reset_unit_state(void);
+
 /* Check if a type requires struct-return ABI (hidden pointer) */
 static int is_struct_return(Type *t) {
     return t && (t->kind == TYPE_STRUCT || t->kind == TYPE_UNION);
@@ -444,6 +446,7 @@ void arch_x86_64_set_target(TargetPlatform target) {
 void arch_x86_64_generate(ASTNode *program) {
     current_program = program;
     pgo_probe_count = 0; /* reset PGO probes for this compilation unit */
+    reset_unit_state();
     for (size_t i = 0; i < program->children_count; i++) {
         ASTNode *child = program->children[i];
         if (child->type == AST_FUNCTION) {
@@ -3201,6 +3204,20 @@ static int loop_saved_stack_offset[32];
 static int loop_saved_locals_count[32];
 static int loop_saved_stack_ptr = 0;
 
+/* Clear per-file tables and counters so each compilation unit in a
+ * multi-file run produces the same output as when compiled on its own. */
+static void reset_unit_state(void) {
+    int i;
+    for (i = 0; i < string_literals_count; i++) {
+        free(string_literals[i].label);
+        free(string_literals[i].value);
+    }
+    string_literals_count = 0;
+    globals_count = 0;
+    label_count = 0;
+    static_label_count = 0;
+}
+
 static void collect_cases(ASTNode *node, ASTNode **cases, int *case_count, ASTNode **default_node) {
     if (!node) return;
     if (node->type == AST_CASE) {
@@ -410,12 +410,25 @@ static int do_cc(int input_count, const char **input_files,
     }
 
     /*
-     * Assembly text path (single file only).
+     * Assembly text path (one file per pass).
+     * Multiple inputs each get their own <base>.s / <base>.asm. An input
+     * that cannot be opened is skipped, but parse and codegen errors exit
+     * the process and end the whole run.
      * Also handles MASM assemble + system link.
      */
     if (input_count > 1) {
-        printf("Error: Multiple input files only supported with binary object output.\n");
-        return 1;
+        int failed = 0;
+        if (output_name) {
+            printf("Error: -o cannot be used with -S and multiple input files.\n");
+            return 1;
+        }
+        for (i = 0; i < input_count; i++) {
+            if (do_cc(1, &input_files[i], NULL, stop, target, use_masm,
+                      lib_count, libraries, libpath_count, libpaths,
+                      define_count, define_names, define_values) != 0)
+                failed = 1;
+        }
+        return failed;
     }
 
     const char *source_filename = input_files[0];
@@ -823,8 +836,11 @@ int main(int argc, char **argv) {
             continue;
         }
         // Positional argument (input file)
-        if (input_count < 64)
-            input_files[input_count++] = argv[i];
+        if (input_count >= 64) {
+            printf("Error: Too many input files (max 64).\n");
+            return 1;
+        }
+        input_files[input_count++] = argv[i];
     }
 
     if (input_count == 0) {
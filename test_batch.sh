@@ -0,0 +1,102 @@
+#!/bin/bash
+# test_batch.sh — Check that compiling several sources in one -S run produces
+#                 byte-identical output to compiling each source on its own.
+#
+# Usage:  ./test_batch.sh [compiler_path]
+#   compiler_path  Path to the compiler binary.
+#                  Defaults to build_linux/fadors99
+#
+set -uo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+cd "$SCRIPT_DIR"
+
+COMPILER="${1:-build_linux/fadors99}"
+
+if [ ! -x "$COMPILER" ]; then
+    echo "[ERROR] Compiler not found at: $COMPILER"
+    exit 1
+fi
+COMPILER="$(cd "$(dirname "$COMPILER")" && pwd)/$(basename "$COMPILER")"
+
+# Flags and output suffix for each assembly text mode
+MODES=(
+    "-S|s"
+    "--masm -S|asm"
+    "--target=dos -S|s"
+)
+
+# Inputs per batched run (the compiler accepts at most 64)
+BATCH_SIZE=32
+
+TMP=$(mktemp -d)
+trap 'rm -rf "$TMP"' EXIT
+
+echo "=== Batched -S Test Suite ==="
+echo "Compiler: $COMPILER"
+echo ""
+
+PASS=0
+FAIL=0
+SKIP_COUNT=0
+TOTAL=0
+
+for mode in "${MODES[@]}"; do
+    flags="${mode%|*}"
+    ext="${mode#*|}"
+
+    # Separate copies of the tests so both runs see the same relative paths
+    # (__FILE__ ends up in the output) and never share output files
+    rm -rf "$TMP/single" "$TMP/batch"
+    cp -r tests "$TMP/single"
+    cp -r tests "$TMP/batch"
+
+    # Reference output: one compiler run per source
+    sources=()
+    for testfile in tests/*.c; do
+        name=$(basename "$testfile" .c)
+        TOTAL=$((TOTAL + 1))
+        (cd "$TMP/single" && "$COMPILER" $flags "$name.c" >/dev/null 2>&1)
+        if [ ! -f "$TMP/single/$name.$ext" ]; then
+            SKIP_COUNT=$((SKIP_COUNT + 1))
+            continue
+        fi
+        sources+=("$name.c")
+    done
+
+    # Same sources, several per compiler run
+    for ((i = 0; i < ${#sources[@]}; i += BATCH_SIZE)); do
+        if ! (cd "$TMP/batch" && "$COMPILER" $flags "${sources[@]:i:BATCH_SIZE}" >/dev/null 2>&1); then
+            echo "  FAIL  batch starting at ${sources[i]}  ($flags exited non-zero)"
+        fi
+    done
+
+    for src in "${sources[@]}"; do
+        name="${src%.c}"
+        if [ ! -f "$TMP/batch/$name.$ext" ]; then
+            echo "  FAIL  $name  ($flags, no .$ext generated in batch)"
+            FAIL=$((FAIL + 1))
+        elif cmp -s "$TMP/single/$name.$ext" "$TMP/batch/$name.$ext"; then
+            PASS=$((PASS + 1))
+        else
+            echo "  FAIL  $name  ($flags, batched output differs)"
+            FAIL=$((FAIL + 1))
+        fi
+    done
+done
+
+echo ""
+echo "=== Results ==="
+echo "  PASS:    $PASS"
+echo "  FAIL:    $FAIL"
+echo "  SKIP:    $SKIP_COUNT"
+echo "  TOTAL:   $TOTAL"
+echo ""
+
+if [ "$FAIL" -eq 0 ]; then
+    echo "All tests passed (excluding sources that do not compile)."
+    exit 0
+else
+    echo "$FAIL test(s) FAILED."
+    exit 1
+fi
@@ -0,0 +1,248 @@
+# Shared plumbing for the Windows test harnesses (test_asm_execution.py, verify_coff.py)
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+# Configuration
+COMPILER = r"build\Release\fadors99.exe"
+ASSEMBLER = "ml64"
+LINKER = "link"
+# Fixed leading arguments; only the per-test file names are appended
+ML64_ARGS = (ASSEMBLER, "/c", "/nologo")
+LINK_ARGS = (LINKER, "/nologo", "/entry:main", "/subsystem:console")
+VCVARS_PATH = r"C:\Program Files\Microsoft Visual Studio\2022\Community\VC\Auxiliary\Build\vcvars64.bat"
+VCVARS_CACHE = ".vcvars_cache.json"
+
+# Compiler flags and output suffix for each backend
+BACKENDS = {
+    "masm": (("--masm", "-S"), ".asm"),
+    "obj": (("--obj",), ".obj"),
+}
+
+# Expected exit codes, keyed by test name (values match test_obj.sh)
+EXPECTED = {
+    "01_return": 42,
+    "02_arithmetic": 7,
+    "03_variables": 30,
+    "04_if": 100,
+    "06_while": 10,
+    "07_function": 123,
+    "11_nested_struct": 10,
+    "12_string": 72,
+    "14_params": 10,
+    "15_nested_calls": 10,
+    "17_for": 45,
+    "18_typedef": 42,
+    "19_array": 100,
+    "20_switch": 120,
+    "21_enum": 6,
+    "22_union": 42,
+    "23_pointer_math": 0,
+}
+
+# Stat the toolchain paths once at startup rather than on every use
+_COMPILER_EXISTS = os.path.exists(COMPILER)
+_COMPILER_MTIME = os.path.getmtime(COMPILER) if _COMPILER_EXISTS else 0.0
+_VCVARS_EXISTS = os.path.exists(VCVARS_PATH)
+
+# One null device handle shared by every subprocess instead of opening it per call
+DEVNULL = open(os.devnull, "wb")
+atexit.register(DEVNULL.close)
+
+# Running vcvars64.bat takes seconds, so keep what it changes on disk and only
+# re-run it when the batch file changes or the cached toolset is gone. Only
+# variables it modified are stored; for those it extended (PATH, INCLUDE, LIB...)
+# just the added prefix is kept, so the rest of the current environment wins.
+def _vcvars_env(delta):
+    env = dict(delta["set"])
+    for key, prefix in delta["prepend"].items():
+        env[key] = prefix + os.environ.get(key, "")
+    return env
+
+def load_vcvars(path):
+    mtime = os.path.getmtime(path)
+    try:
+        with open(VCVARS_CACHE) as f:
+            cache = json.load(f)
+        if cache.get("path") == path and cache.get("mtime") == mtime:
+            env = _vcvars_env(cache)
+            # A Visual Studio update can replace the toolset without touching vcvars64.bat
+            if shutil.which(ASSEMBLER, path=env.get("PATH")):
+                return env
+    except (OSError, ValueError, KeyError):
+        pass
+
+    output = subprocess.check_output(f'"{path}" && set', shell=True, text=True)
+    delta = {"set": {}, "prepend": {}}
+    for line in output.splitlines():
+        if "=" in line:
+            key, value = line.split("=", 1)
+            old = os.environ.get(key)
+            if value == old:
+                continue
+            if old and value.endswith(old):
+                delta["prepend"][key] = value[:-len(old)]
+            else:
+                delta["set"][key] = value
+
+    with open(VCVARS_CACHE, "w") as f:
+        json.dump({"path": path, "mtime": mtime, **delta}, f)
+    return _vcvars_env(delta)
+
+def setup_environment():
+    # Fail fast before spending seconds on vcvars when the compiler isn't built
+    if not _COMPILER_EXISTS:
+        print(f"Compiler not found at {COMPILER}")
+        sys.exit(1)
+
+    # We need vcvars64 for the assembler and linker
+    if _VCVARS_EXISTS:
+        os.environ.update(load_vcvars(VCVARS_PATH))
+
+# A missing source also counts as stale, so the compiler gets to report it and the
+# test fails on its own instead of taking the whole run down.
+def needs_rebuild(c_file, out_file):
+    try:
+        out_mtime = out_file.stat().st_mtime
+        src_mtime = c_file.stat().st_mtime
+    except FileNotFoundError:
+        return True
+    return src_mtime > out_mtime or _COMPILER_MTIME > out_mtime
+
+def has_output(out_file):
+    try:
+        return out_file.stat().st_size > 0
+    except FileNotFoundError:
+        return False
+
+# Compile every out-of-date test in a single compiler run to avoid paying process
+# startup per file. The compiler stops at the first source it fails on, so stale
+# outputs are removed first and every test still without output afterwards is
+# recompiled on its own, which also attributes the diagnostics to that test.
+# A failure during codegen leaves a partial output behind, so when the batch
+# fails the last test that produced output is recompiled too, and the output of
+# any failed single-file compile is deleted.
+# Returns {c_file: compiler output} for the tests that were recompiled.
+def compile_tests(c_files, backend, env=None):
+    flags, suffix = BACKENDS[backend]
+    stale = [f for f in c_files if needs_rebuild(f, f.with_suffix(suffix))]
+    for c_file in stale:
+        c_file.with_suffix(suffix).unlink(missing_ok=True)
+    if not stale:
+        return {}
+    batch = subprocess.run([COMPILER, *flags, *stale], stdout=DEVNULL, stderr=DEVNULL, env=env)
+
+    produced = [f for f in stale if has_output(f.with_suffix(suffix))]
+    retry = [f for f in stale if f not in produced]
+    if batch.returncode != 0 and produced:
+        retry.append(produced[-1])
+
+    outputs = {}
+    for c_file in retry:
+        out_file = c_file.with_suffix(suffix)
+        out_file.unlink(missing_ok=True)
+        result = subprocess.run([COMPILER, *flags, c_file], capture_output=True,
+                                text=True, env=env)
+        if result.returncode != 0:
+            out_file.unlink(missing_ok=True)
+        outputs[c_file] = result.stdout + result.stderr
+    return outputs
+
+# Child exits are collected by the event loop (process handles on Windows, the
+# child watcher elsewhere), so no thread blocks in wait() per subprocess.
+async def run(argv, stderr=None):
+    proc = await asyncio.create_subprocess_exec(*argv, stdout=DEVNULL, stderr=stderr)
+    return await proc.wait()
+
+async def run_captured(argv):
+    proc = await asyncio.create_subprocess_exec(*argv, stdout=asyncio.subprocess.PIPE,
+                                                stderr=asyncio.subprocess.PIPE)
+    stdout, stderr = await proc.communicate()
+    return proc.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+# Raises FileNotFoundError when ml64/link are not in PATH and
+# CalledProcessError when either step fails.
+async def assemble_link(asm_file):
+    obj_file = asm_file.with_suffix(".obj")
+    argv = (*ML64_ARGS, f"/Fo{obj_file}", str(asm_file))
+    ret_code = await run(argv)
+    if ret_code != 0:
+        raise subprocess.CalledProcessError(ret_code, argv)
+    return await link(obj_file)
+
+# Raises FileNotFoundError when link is not in PATH and CalledProcessError when it fails.
+async def link(obj_file, libs=()):
+    exe_file = obj_file.with_suffix(".exe")
+    argv = (*LINK_ARGS, f"/out:{exe_file}", str(obj_file), *libs)
+    ret_code = await run(argv)
+    if ret_code != 0:
+        raise subprocess.CalledProcessError(ret_code, argv)
+    return exe_file
+
+# Windows return codes are usually 0-255 for success/small errors,
+# but can be large for crashes. We need to handle this.
+def signed_exit_code(ret_code):
+    ret_code &= 0xFFFFFFFF
+    if ret_code > 0x7FFFFFFF:
+        ret_code -= 0x100000000
+    return ret_code
+
+async def run_exe(exe_file):
+    return signed_exit_code(await run([str(exe_file)], stderr=DEVNULL))
+
+# Same as run_exe, but also returns the program's stdout and stderr
+async def run_exe_captured(exe_file):
+    ret_code, stdout, stderr = await run_captured([str(exe_file)])
+    return signed_exit_code(ret_code), stdout, stderr
+
+# Tests only wait on subprocesses, so overlapping them on one event loop keeps all
+# cores busy. Output files derive from the .c name, so concurrent tests never
+# share a file. run_test(c_file) returns (status, reason, returncode, log), where
+# reason is a short tag such as "Comp" or None; the log is printed once the test
+# is done so output from concurrent tests never interleaves.
+def run_tests(run_test, c_files):
+    async def run_all():
+        sem = asyncio.Semaphore(os.cpu_count() or 1)
+
+        async def run_one(c_file):
+            async with sem:
+                t0 = time.perf_counter()
+                status, reason, ret_code, log = await run_test(c_file)
+                duration_ms = round((time.perf_counter() - t0) * 1000, 1)
+            result = {"name": c_file.stem, "status": status, "reason": reason,
+                      "returncode": ret_code, "expected": EXPECTED.get(c_file.stem),
+                      "duration_ms": duration_ms}
+            return result, log
+
+        results = []
+        for fut in asyncio.as_completed([run_one(f) for f in c_files]):
+            result, log = await fut
+            sys.stdout.write("\n".join(log) + "\n")
+            results.append(result)
+        return results
+
+    return asyncio.run(run_all())
+
+# Prints a per-test table and writes the results to json_path for CI.
+# Returns True when no test failed (skipped tests count as passed).
+def summarize(results, json_path):
+    results.sort(key=lambda r: r["name"])
+    with open(json_path, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for r in results:
+        status = r["status"]
+        if r["reason"]:
+            status += f" ({r['reason']})"
+        elif status == "FAIL" and r["returncode"] is not None:
+            status += f" (Got {r['returncode']})"
+        print(f"{r['name']:25} : {status}")
+
+    passed = sum(r["status"] != "FAIL" for r in results)
+    print(f"\nSummary: {passed}/{len(results)} tests passed")
+    return passed == len(results)